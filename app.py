@@ -3,9 +3,9 @@
 SendingInfo.in - File & Text Sharing Platform
 ------------------------------------------------
 This Flask application powers:
-  1) Anonymous file uploads with a 6-digit code for download
+  1) Anonymous file uploads with a 6-digit code for download (8 when busy)
      - Expiry: 24 hours or when download count reaches a limit
-     - Background cleanup job
+     - Expired rows swept on demand by write requests
   2) Anonymous text/code sharing ("pastes") with 6-char code & view limits
      - Expiry: 24 hours or when view count reaches a limit
   3) Feedback collection (optional name) with email notification to admin
@@ -16,24 +16,42 @@ This Flask application powers:
 
 This file is intentionally verbose with comments & docstrings
 to make it easy to understand and safely exceed 550 lines.
+
+Run in production with: gunicorn -c gunicorn.conf.py app:app
 """
 
 from flask import (
-    Flask, render_template, request, jsonify, send_from_directory,
+    Flask, Request, render_template, request, jsonify, send_file,
     flash, redirect, url_for, session, Response
 )
 import os
+import mmap
+import fcntl
+import tempfile
+from urllib.parse import quote
 import sqlite3
-import random
-from datetime import datetime, timedelta
+import secrets
+import queue
+from contextlib import contextmanager
 import threading
 import time
 from werkzeug.security import generate_password_hash, check_password_hash
 from werkzeug.utils import secure_filename
+from werkzeug.exceptions import RequestedRangeNotSatisfiable, RequestEntityTooLarge
+from flask.json.provider import DefaultJSONProvider
 from flask_mail import Mail, Message
-from collections import defaultdict
+from collections import OrderedDict
 import logging
+import functools
+import itertools
 import ipaddress
+import hmac
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+try:
+    import orjson  # optional: faster JSON; falls back to Flask's stdlib json
+except ImportError:
+    orjson = None
 
 # =============================================================================
 # App / Runtime Configuration
@@ -54,6 +72,92 @@ os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 # 2GB upload limit (hosting provider may enforce lower limits)
 app.config["MAX_CONTENT_LENGTH"] = 2 * 1024 * 1024 * 1024  # 2GB
 
+# Files and pastes live for 24 hours. created_at columns hold unix seconds.
+EXPIRY_SECONDS = 24 * 60 * 60
+
+# Uploads in progress are spooled to UPLOAD_FOLDER under this prefix
+UPLOAD_SPOOL_PREFIX = ".incoming_"
+
+# Stored files must stay readable by nginx (X-Accel-Redirect) when it runs as
+# another user. tempfile creates 0600 files and os.replace() keeps the mode.
+UPLOAD_FILE_MODE = 0o644
+
+# Read/write size when copying /upload_raw bodies. Werkzeug's default is
+# 64KB; bigger chunks mean far fewer read()/write() calls per upload.
+UPLOAD_CHUNK_SIZE = 4 * 1024 * 1024  # 4MB
+
+# -----------------------------------------------------------------------------
+# Optional nginx offload for downloads. When set (e.g. "/internal/"), downloads
+# return an X-Accel-Redirect header and nginx serves the file with sendfile(2).
+# Matching nginx config:
+#     location /internal/ { internal; alias /path/to/app/uploads/; }
+# Leave empty to serve from Flask (send_file -> wsgi.file_wrapper, which
+# gunicorn also turns into sendfile).
+# -----------------------------------------------------------------------------
+X_ACCEL_REDIRECT_PREFIX = os.getenv("X_ACCEL_REDIRECT_PREFIX", "")
+
+# nginx only opens the file after it has read our response headers, so the
+# last allowed download's file is removed this long after the response.
+# Once nginx has it open, the unlink no longer affects the transfer.
+X_ACCEL_DELETE_DELAY_SEC = 10
+
+# -----------------------------------------------------------------------------
+# Upload spooling
+# Werkzeug normally buffers file parts in a SpooledTemporaryFile (memory, then
+# /tmp) and FileStorage.save() copies that into place: every byte is written
+# twice. Spooling straight into UPLOAD_FOLDER lets upload_file() hand the
+# spool over with os.replace() (same filesystem), so it is written once.
+# -----------------------------------------------------------------------------
+class UploadRequest(Request):
+    """
+    Request whose uploaded file parts are written to named spool files in
+    UPLOAD_FOLDER. Spools not claimed by the view are removed on close.
+    """
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        spool = tempfile.NamedTemporaryFile(dir=UPLOAD_FOLDER, prefix=UPLOAD_SPOOL_PREFIX, delete=False)
+        os.fchmod(spool.fileno(), UPLOAD_FILE_MODE)
+        if not hasattr(self, "_upload_spools"):
+            self._upload_spools = []
+        self._upload_spools.append(spool.name)
+        return spool
+
+    def close(self):
+        super().close()
+        for path in getattr(self, "_upload_spools", ()):
+            unlink_quietly(path)
+
+
+app.request_class = UploadRequest
+
+# -----------------------------------------------------------------------------
+# JSON: use orjson (C/Rust) when installed for jsonify() and request.get_json()
+# -----------------------------------------------------------------------------
+class OrjsonProvider(DefaultJSONProvider):
+    """
+    Flask JSON provider backed by orjson. Responses are built straight from
+    the encoded bytes; calls with extra json.dumps options use the default.
+    """
+
+    def dumps(self, obj, **kwargs):
+        if kwargs:
+            return super().dumps(obj, **kwargs)
+        return orjson.dumps(obj, default=self.default, option=orjson.OPT_NON_STR_KEYS).decode("utf-8")
+
+    def loads(self, s, **kwargs):
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        body = orjson.dumps(obj, default=self.default, option=orjson.OPT_NON_STR_KEYS)
+        return self._app.response_class(body, mimetype=self.mimetype)
+
+
+if orjson is not None:
+    app.json = OrjsonProvider(app)
+
 # -----------------------------------------------------------------------------
 # Email (Feedback notifications)
 # You can override with environment variables in production.
@@ -72,6 +176,7 @@ mail = Mail(app)
 # Optional admin key for stats access. Change in production.
 # -----------------------------------------------------------------------------
 ADMIN_STATS_KEY = os.getenv("ADMIN_STATS_KEY", "nathanieyulu_secret")
+ADMIN_FEEDBACK_KEY = os.getenv("ADMIN_FEEDBACK_KEY", "NathaniyeluSuperSecret")
 
 # -----------------------------------------------------------------------------
 # Logging Setup (console)
@@ -90,144 +195,383 @@ logger.setLevel(logging.INFO)
 # Database Helpers
 # =============================================================================
 
+# Size of the shared connection pool. SQLite serialises writers anyway, so a
+# handful of connections is plenty for the gunicorn/threaded workers.
+DB_POOL_SIZE = min((os.cpu_count() or 1) * 2, 8)
+
+_db_pool = queue.Queue(maxsize=DB_POOL_SIZE)
+_db_pool_lock = threading.Lock()
+_db_pool_created = 0
+
+# How long a connection waits on a locked database before SQLITE_BUSY
+DB_BUSY_TIMEOUT_MS = 5000
+
+# -----------------------------------------------------------------------------
+# Hot-path SQL, defined once so every call passes the identical string and
+# hits sqlite3's per-connection prepared-statement cache
+# -----------------------------------------------------------------------------
+SQL_FILE_INSERT = (
+    "INSERT INTO files (code, filename, created_at, max_downloads, current_downloads) VALUES (?, ?, ?, ?, ?)"
+)
+# Expiry check + counter increment in one atomic statement
+SQL_FILE_CONSUME = (
+    "UPDATE files SET current_downloads = current_downloads + 1 "
+    "WHERE code=? AND current_downloads < max_downloads AND created_at > ? "
+    "RETURNING id, filename, current_downloads, max_downloads"
+)
+SQL_PASTE_INSERT = (
+    "INSERT INTO pastes (code, content, lang, created_at, max_views, current_views) VALUES (?, ?, ?, ?, ?, ?)"
+)
+SQL_PASTE_CONSUME = (
+    "UPDATE pastes SET current_views = current_views + 1 "
+    "WHERE code=? AND current_views < max_views AND created_at > ? "
+    "RETURNING id, content, lang, current_views, max_views"
+)
+# Expiry batches: DELETE ... LIMIT is not compiled into stock SQLite
+SQL_EXPIRE_FILES = (
+    "DELETE FROM files WHERE id IN (SELECT id FROM files WHERE created_at < ? LIMIT ?) RETURNING code"
+)
+SQL_EXPIRE_PASTES = (
+    "DELETE FROM pastes WHERE id IN (SELECT id FROM pastes WHERE created_at < ? LIMIT ?)"
+)
+SQL_EXPIRE_UPLOAD_SESSIONS = (
+    "DELETE FROM upload_sessions WHERE id IN "
+    "(SELECT id FROM upload_sessions WHERE created_at < ? LIMIT ?) RETURNING upload_id"
+)
+
+
 def db_conn():
     """
     Open a sqlite3 connection with Row factory for dict-like access.
+    The PRAGMAs are applied once here; pooled connections keep them.
+    Prefer get_conn() in routes so the connection is reused.
     """
-    conn = sqlite3.connect(DB_PATH)
+    # isolation_level=None: no implicit BEGIN; get_conn() opens transactions explicitly
+    conn = sqlite3.connect(DB_PATH, check_same_thread=False, isolation_level=None)
     conn.row_factory = sqlite3.Row
+    # WAL lets readers proceed while a writer commits; NORMAL sync is safe in WAL
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute(f"PRAGMA busy_timeout={DB_BUSY_TIMEOUT_MS}")
+    # upload_chunks rows go away with their upload_sessions row
+    conn.execute("PRAGMA foreign_keys=ON")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    conn.execute("PRAGMA cache_size=-20000")  # ~20MB page cache
     return conn
 
 
+def _checkout_conn():
+    """
+    Take an idle connection from the pool, opening a new one while the
+    pool is below DB_POOL_SIZE; otherwise wait for one to be returned.
+    """
+    global _db_pool_created
+    try:
+        return _db_pool.get_nowait()
+    except queue.Empty:
+        pass
+
+    with _db_pool_lock:
+        can_open = _db_pool_created < DB_POOL_SIZE
+        if can_open:
+            _db_pool_created += 1
+
+    if not can_open:
+        return _db_pool.get()
+
+    try:
+        return db_conn()
+    except Exception:
+        with _db_pool_lock:
+            _db_pool_created -= 1
+        raise
+
+
+@contextmanager
+def get_conn(immediate=False):
+    """
+    Borrow a pooled connection. The whole block is one transaction:
+      - commits once on normal exit, rolls back if the block raises
+      - always hands the connection back to the pool
+    Group related writes in a single block so they share one commit.
+    Pass immediate=True for blocks that write (BEGIN IMMEDIATE): the write
+    lock is taken up front, so a read-then-write block can neither lose an
+    update nor fail with SQLITE_BUSY when upgrading its lock.
+    Usage:
+        with get_conn(immediate=True) as conn:
+            conn.execute(...)
+    """
+    conn = _checkout_conn()
+    try:
+        conn.execute("BEGIN IMMEDIATE" if immediate else "BEGIN")
+        with conn:
+            yield conn
+    finally:
+        if conn.in_transaction:  # e.g. COMMIT itself failed
+            conn.rollback()
+        _db_pool.put(conn)
+
+
+def _rename_legacy_tables(c):
+    """
+    One-shot migration helper: tables created before created_at became an
+    INTEGER unix timestamp still declare it TEXT (ISO strings). Rename them
+    out of the way so init_db() can recreate them and copy the rows over.
+    Returns the names of the renamed tables.
+    """
+    legacy = []
+    for table in ("files", "pastes", "feedback"):
+        cols = {r["name"]: r["type"] for r in c.execute(f"PRAGMA table_info({table})")}
+        if cols.get("created_at", "").upper() == "TEXT":
+            legacy.append(table)
+
+    for table in legacy:
+        c.execute(f"ALTER TABLE {table} RENAME TO {table}_legacy")
+    return legacy
+
+
+def _copy_legacy_rows(c, table):
+    """
+    Copy rows from `<table>_legacy` into the new table, converting the ISO
+    created_at string to unix seconds, then drop the legacy table.
+    """
+    cols = [r["name"] for r in c.execute(f"PRAGMA table_info({table}_legacy)")]
+    exprs = [
+        "CAST(strftime('%s', created_at) AS INTEGER)" if col == "created_at" else col
+        for col in cols
+    ]
+    c.execute(
+        f"INSERT INTO {table} ({', '.join(cols)}) "
+        f"SELECT {', '.join(exprs)} FROM {table}_legacy"
+    )
+    c.execute(f"DROP TABLE {table}_legacy")
+    logger.info(f"🔁 Migrated {table}.created_at to unix timestamps")
+
+
 def init_db():
     """
     Create the necessary tables if they don't exist.
     (Users, Files, Pastes, Feedback)
     """
-    conn = db_conn()
-    c = conn.cursor()
+    with get_conn(immediate=True) as conn:
+        c = conn.cursor()
 
-    # Users: kept for possible future admin login, not required for usage
-    c.execute("""
-        CREATE TABLE IF NOT EXISTS users (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            username TEXT UNIQUE,
-            email TEXT UNIQUE,
-            password TEXT
-        )
-    """)
-
-    # Files table
-    c.execute("""
-        CREATE TABLE IF NOT EXISTS files (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            code TEXT UNIQUE,
-            filename TEXT,
-            created_at TEXT,
-            max_downloads INTEGER,
-            current_downloads INTEGER
-        )
-    """)
-
-    # Pastes table (text/code)
-    c.execute("""
-        CREATE TABLE IF NOT EXISTS pastes (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            code TEXT UNIQUE,
-            content TEXT,
-            lang TEXT,
-            created_at TEXT,
-            max_views INTEGER,
-            current_views INTEGER DEFAULT 0
-        )
-    """)
-
-    # Feedback table
-    c.execute("""
-        CREATE TABLE IF NOT EXISTS feedback (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT,
-            message TEXT,
-            created_at TEXT
-        )
-    """)
+        legacy_tables = _rename_legacy_tables(c)
 
-    # Simple indices for performance
-    c.execute("CREATE INDEX IF NOT EXISTS idx_files_code ON files(code)")
-    c.execute("CREATE INDEX IF NOT EXISTS idx_pastes_code ON pastes(code)")
-    c.execute("CREATE INDEX IF NOT EXISTS idx_feedback_created ON feedback(created_at)")
+        # Users: kept for possible future admin login, not required for usage
+        c.execute("""
+            CREATE TABLE IF NOT EXISTS users (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                username TEXT UNIQUE,
+                email TEXT UNIQUE,
+                password TEXT
+            )
+        """)
+
+        # Files table
+        c.execute("""
+            CREATE TABLE IF NOT EXISTS files (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                code TEXT UNIQUE,
+                filename TEXT,
+                created_at INTEGER,
+                max_downloads INTEGER,
+                current_downloads INTEGER
+            )
+        """)
+
+        # Pastes table (text/code)
+        c.execute("""
+            CREATE TABLE IF NOT EXISTS pastes (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                code TEXT UNIQUE,
+                content TEXT,
+                lang TEXT,
+                created_at INTEGER,
+                max_views INTEGER,
+                current_views INTEGER DEFAULT 0
+            )
+        """)
+
+        # Feedback table
+        c.execute("""
+            CREATE TABLE IF NOT EXISTS feedback (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                name TEXT,
+                message TEXT,
+                created_at INTEGER
+            )
+        """)
+
+        # Resumable (chunked) uploads in progress; finished ones become files rows.
+        # Chunks are keyed by their start offset, so a re-sent chunk is a no-op.
+        c.execute("""
+            CREATE TABLE IF NOT EXISTS upload_sessions (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                upload_id TEXT UNIQUE,
+                filename TEXT,
+                max_downloads INTEGER,
+                total_size INTEGER,
+                created_at INTEGER,
+                client_ip TEXT
+            )
+        """)
+        # Sessions created before the per-client caps lack client_ip
+        if "client_ip" not in {r["name"] for r in c.execute("PRAGMA table_info(upload_sessions)")}:
+            c.execute("ALTER TABLE upload_sessions ADD COLUMN client_ip TEXT")
+        c.execute("""
+            CREATE TABLE IF NOT EXISTS upload_chunks (
+                session_id INTEGER REFERENCES upload_sessions(id) ON DELETE CASCADE,
+                start INTEGER,
+                length INTEGER,
+                PRIMARY KEY (session_id, start)
+            ) WITHOUT ROWID
+        """)
+
+        for table in legacy_tables:
+            _copy_legacy_rows(c, table)
+
+        # Simple indices for performance.
+        # code lookups use the index that UNIQUE(code) already creates; a second
+        # index on code (or a covering one holding the counters) would only add
+        # a B-tree write to every upload, view and download UPDATE.
+        c.execute("DROP INDEX IF EXISTS idx_files_code")
+        c.execute("DROP INDEX IF EXISTS idx_pastes_code")
+        c.execute("CREATE INDEX IF NOT EXISTS idx_feedback_created ON feedback(created_at)")
+        # Expiry sweeps range-scan on created_at
+        c.execute("CREATE INDEX IF NOT EXISTS idx_files_created ON files(created_at)")
+        c.execute("CREATE INDEX IF NOT EXISTS idx_pastes_created ON pastes(created_at)")
+        c.execute("CREATE INDEX IF NOT EXISTS idx_upload_sessions_created ON upload_sessions(created_at)")
+        c.execute("CREATE INDEX IF NOT EXISTS idx_upload_sessions_client ON upload_sessions(client_ip)")
 
-    conn.commit()
-    conn.close()
     logger.info("✅ Database initialized")
 
 
+def stored_file_path(code):
+    """
+    Where an upload's data lives: UPLOAD_FOLDER/<code[:2]>/<code>.
+    The two-character fan-out keeps every directory small; the original
+    filename stays in the files table for Content-Disposition only.
+    """
+    return os.path.join(UPLOAD_FOLDER, code[:2], code)
+
+
+def _create_fanout_dirs():
+    """
+    Create every UPLOAD_FOLDER/<code[:2]> directory up front (file codes
+    never start with 0), so no upload does directory work while it holds
+    the database write lock.
+    """
+    for prefix in range(10, 100):
+        os.makedirs(os.path.join(UPLOAD_FOLDER, str(prefix)), exist_ok=True)
+
+
+def _migrate_flat_uploads():
+    """
+    One-shot migration: move files stored as UPLOAD_FOLDER/<code>_<name>
+    (the old flat layout) to stored_file_path(code). Spools are left alone.
+    """
+    moved = 0
+    with os.scandir(UPLOAD_FOLDER) as entries:
+        for entry in entries:
+            if entry.name.startswith(UPLOAD_SPOOL_PREFIX) or "_" not in entry.name or not entry.is_file():
+                continue
+            dest = stored_file_path(entry.name.split("_", 1)[0])
+            try:
+                os.replace(entry.path, dest)
+                moved += 1
+            except FileNotFoundError:
+                pass
+    if moved:
+        logger.info(f"📦 Moved {moved} uploads to the code-only layout")
+
+
 init_db()
+_create_fanout_dirs()
+_migrate_flat_uploads()
 
 # =============================================================================
-# Background Cleanup Job
+# Expiry (on demand)
 # =============================================================================
 
-def cleanup_job():
+# Expired rows are removed a batch at a time by requests that write anyway
+# (uploads, downloads, new pastes), inside their own transaction: the work
+# follows traffic, an idle server does nothing, and there is no extra commit.
+# created_at is indexed, so finding nothing to expire is a single probe.
+EXPIRE_BATCH = 64
+
+# Unlinks of expired files run here, off the request thread
+_unlink_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="unlink")
+
+
+def unlink_quietly(path):
     """
-    Periodically removes expired files and pastes.
-    Runs every 2 hours; deletes items older than 24 hours.
+    Remove a file with a single unlink() (no exists() check first).
+    A file that is already gone is fine; other errors are only logged.
     """
-    while True:
-        try:
-            now = datetime.utcnow()
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        logger.error(f"Could not remove {path}: {e}")
 
-            # Clean expired files (24h)
-            conn = db_conn()
-            c = conn.cursor()
-            c.execute("SELECT id, code, filename, created_at FROM files")
-            rows = c.fetchall()
-            deleted_files = 0
-            for row in rows:
-                fid = row["id"]
-                code = row["code"]
-                filename = row["filename"]
-                created_at = datetime.fromisoformat(row["created_at"])
-                file_path = os.path.join(UPLOAD_FOLDER, f"{code}_{filename}")
-
-                if now >= created_at + timedelta(hours=24) or not os.path.exists(file_path):
-                    try:
-                        if os.path.exists(file_path):
-                            os.remove(file_path)
-                    except Exception:
-                        pass
-                    c.execute("DELETE FROM files WHERE id=?", (fid,))
-                    conn.commit()
-                    deleted_files += 1
-            conn.close()
-            if deleted_files:
-                logger.info(f"🧹 Deleted {deleted_files} expired/ghost files")
-
-            # Clean expired pastes (24h)
-            conn = db_conn()
-            c = conn.cursor()
-            c.execute("SELECT id, created_at FROM pastes")
-            rows = c.fetchall()
-            deleted_pastes = 0
-            for row in rows:
-                pid = row["id"]
-                created_at = datetime.fromisoformat(row["created_at"])
-                if now >= created_at + timedelta(hours=24):
-                    c.execute("DELETE FROM pastes WHERE id=?", (pid,))
-                    conn.commit()
-                    deleted_pastes += 1
-            conn.close()
-            if deleted_pastes:
-                logger.info(f"🧹 Deleted {deleted_pastes} expired pastes")
 
-        except Exception as e:
-            logger.error(f"Cleanup error: {e}")
+def _sweep_stale_spools(cutoff):
+    """
+    Remove upload spools (UPLOAD_SPOOL_PREFIX*) last written before `cutoff`.
+    Spools are normally renamed into place or removed when their request
+    closes; this only catches ones left behind by a killed worker.
+    Returns how many were removed.
+    """
+    removed = 0
+    with os.scandir(UPLOAD_FOLDER) as entries:
+        for entry in entries:
+            if not entry.name.startswith(UPLOAD_SPOOL_PREFIX):
+                continue
+            try:
+                if entry.stat().st_mtime < cutoff:
+                    os.unlink(entry.path)
+                    removed += 1
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                logger.error(f"Could not remove {entry.path}: {e}")
+    return removed
+
 
-        # Sleep 2 hours
-        time.sleep(2 * 60 * 60)
+def expire_batch(conn):
+    """
+    Delete up to EXPIRE_BATCH expired files, pastes and unfinished chunked
+    uploads in the caller's write transaction. Returns (file codes, upload
+    ids): hand them to remove_expired_files() once the transaction has
+    committed.
+    """
+    cutoff = int(time.time()) - EXPIRY_SECONDS
+    codes = [row[0] for row in conn.execute(SQL_EXPIRE_FILES, (cutoff, EXPIRE_BATCH))]
+    deleted_pastes = conn.execute(SQL_EXPIRE_PASTES, (cutoff, EXPIRE_BATCH)).rowcount
+    if deleted_pastes:
+        logger.info(f"🧹 Deleted {deleted_pastes} expired pastes")
+    upload_ids = [row[0] for row in conn.execute(SQL_EXPIRE_UPLOAD_SESSIONS, (cutoff, EXPIRE_BATCH))]
+    return codes, upload_ids
 
 
-threading.Thread(target=cleanup_job, daemon=True).start()
+def remove_expired_files(expired):
+    """
+    Release the codes returned by expire_batch() and unlink their data (and
+    the spools of abandoned chunked uploads) in the background.
+    """
+    codes, upload_ids = expired
+    for code in codes:
+        release_file_code(code)
+        _unlink_pool.submit(unlink_quietly, stored_file_path(code))
+    for upload_id in upload_ids:
+        _unlink_pool.submit(unlink_quietly, _chunked_spool_path(upload_id))
+    if codes:
+        logger.info(f"🧹 Deleted {len(codes)} expired files")
+    if upload_ids:
+        logger.info(f"🧹 Deleted {len(upload_ids)} abandoned chunked uploads")
+
 
 # =============================================================================
 # Very Simple In-Memory Rate Limiter (per IP)
@@ -235,26 +579,41 @@ threading.Thread(target=cleanup_job, daemon=True).start()
 
 RATE_LIMIT_WINDOW_SEC = 60  # window of 60s
 RATE_LIMIT_MAX_REQS   = 120 # max requests per window per IP (very generous)
+RATE_LIMIT_MAX_IPS    = 50_000  # tracked IPs; least recently seen are evicted
 
-# ip -> [timestamps]
-_ip_requests = defaultdict(list)
+# Endpoints never rate limited (static files, probes, crawler files)
+_SKIP_ENDPOINTS = frozenset({"static", "healthz", "robots", "sitemap"})
 
+# ip -> [window_id, count in that window, count in the previous window],
+# kept in LRU order. Three ints per IP instead of a timestamp per request.
+_ip_counters = OrderedDict()
+_ip_counters_lock = threading.Lock()
 
-def _client_ip():
+
+@functools.lru_cache(maxsize=4096)
+def _valid_ip(candidate):
     """
-    Basic client IP detection. Behind proxies, configure properly or use
-    request.headers.get("X-Forwarded-For") if trusted.
+    Return `candidate` if it is a valid IPv4/IPv6 address, else None.
+    Cached: ipaddress parsing is pure Python and the same IPs repeat.
     """
     try:
-        candidate = request.headers.get("X-Forwarded-For", request.remote_addr)
-        # strip multiple if present
-        if candidate and "," in candidate:
-            candidate = candidate.split(",")[0].strip()
-        # validate ip
         ipaddress.ip_address(candidate)
         return candidate
-    except Exception:
-        return request.remote_addr or "0.0.0.0"
+    except ValueError:
+        return None
+
+
+def _client_ip():
+    """
+    Basic client IP detection. Behind proxies, configure properly or use
+    request.headers.get("X-Forwarded-For") if trusted.
+    """
+    candidate = request.headers.get("X-Forwarded-For", request.remote_addr)
+    # strip multiple if present
+    if candidate and "," in candidate:
+        candidate = candidate.split(",")[0].strip()
+    # validate ip
+    return (candidate and _valid_ip(candidate)) or request.remote_addr or "0.0.0.0"
 
 
 @app.before_request
@@ -262,58 +621,185 @@ def rate_limit_guard():
     """
     Simple sliding window rate limit, in-memory only.
     Safe default, won't block normal usage.
+    Uses the sliding-window-counter approximation: the previous fixed
+    window's count is weighted by how much of it still overlaps the last
+    RATE_LIMIT_WINDOW_SEC seconds, plus the current window's count.
     """
-    # You can exclude static files or health checks
-    p = request.path or ""
-    if p.startswith("/static/") or p in ("/healthz", "/robots.txt", "/sitemap.txt"):
+    # Skip static files and health checks: one set lookup on the matched
+    # endpoint, before any IP parsing
+    if request.endpoint in _SKIP_ENDPOINTS:
         return
 
-    now = time.time()
+    # monotonic: cheap and immune to wall-clock jumps
+    window_id, offset = divmod(time.monotonic(), RATE_LIMIT_WINDOW_SEC)
+    window_id = int(window_id)
     ip = _client_ip()
-    window_start = now - RATE_LIMIT_WINDOW_SEC
 
-    # prune old
-    entries = _ip_requests[ip]
-    while entries and entries[0] < window_start:
-        entries.pop(0)
+    with _ip_counters_lock:
+        state = _ip_counters.get(ip)
+        if state is None:
+            state = _ip_counters[ip] = [window_id, 0, 0]
+            # bound memory: drop the least recently seen IP
+            if len(_ip_counters) > RATE_LIMIT_MAX_IPS:
+                _ip_counters.popitem(last=False)
+        else:
+            _ip_counters.move_to_end(ip)
+            if state[0] != window_id:
+                # roll over: the old window only counts if it is the one just before
+                state[2] = state[1] if state[0] == window_id - 1 else 0
+                state[1] = 0
+                state[0] = window_id
 
-    entries.append(now)
-    _ip_requests[ip] = entries
+        state[1] += 1
+        hits = state[2] * (1 - offset / RATE_LIMIT_WINDOW_SEC) + state[1]
 
-    if len(entries) > RATE_LIMIT_MAX_REQS:
+    if hits > RATE_LIMIT_MAX_REQS:
         return jsonify({"error": "Too many requests. Please slow down."}), 429
 
 # =============================================================================
 # Utility Functions
 # =============================================================================
 
+# How many fresh codes to try before giving up on an INSERT
+CODE_INSERT_ATTEMPTS = 5
+
+PASTE_CODE_ALPHABET = "ABCDEFGHJKLMNPQRSTUVWXYZ23456789"
+
+# 32 symbols = 5 bits: map every random byte through its low 5 bits. 256 is a
+# multiple of 32, so each symbol is equally likely (no rejection needed).
+_PASTE_CODE_TABLE = bytes(ord(PASTE_CODE_ALPHABET[b & 31]) for b in range(256))
+
+# File codes currently in use, as seen by this process. Other workers insert
+# too, so this is only a hint: UNIQUE(code) in insert_with_code() stays the
+# final check, and uploads reload the set once it is ACTIVE_CODES_MAX_AGE_SEC old.
+ACTIVE_CODES = set()
+ACTIVE_CODES_MAX_AGE_SEC = 10 * 60
+_active_codes_lock = threading.Lock()
+_active_codes_loaded = 0.0
+
+# How many draws new_file_code() makes before leaving it to insert_with_code()
+ACTIVE_CODE_DRAWS = 64
+
+# Once half of the 900,000 six-digit codes are live, new files get 8-digit
+# codes so a free code is still found in one or two draws
+SHORT_CODE_LIMIT = 450_000
+
+
 def six_digit_code():
     """
-    Generate a unique 6-digit numeric code for files.
+    Generate a random 6-digit numeric code for files (CSPRNG).
+    Uniqueness is enforced by insert_with_code().
     """
-    conn = db_conn()
-    c = conn.cursor()
-    while True:
-        code = str(random.randint(100000, 999999))
-        c.execute("SELECT 1 FROM files WHERE code=?", (code,))
-        if not c.fetchone():
-            conn.close()
-            return code
+    return f"{secrets.randbelow(900000) + 100000:06d}"
+
+
+def eight_digit_code():
+    """
+    Generate a random 8-digit numeric code for files (CSPRNG), used once
+    the six-digit space is crowded. Like six-digit codes it never starts
+    with 0, so it maps onto the same fan-out directories.
+    """
+    return f"{secrets.randbelow(90000000) + 10000000:08d}"
+
+
+def new_file_code():
+    """
+    Draw a code that is not in ACTIVE_CODES and reserve it, so concurrent
+    uploads in this process never collide on INSERT. Six digits normally,
+    eight once more than SHORT_CODE_LIMIT codes are live.
+    """
+    with _active_codes_lock:
+        make_code = eight_digit_code if len(ACTIVE_CODES) > SHORT_CODE_LIMIT else six_digit_code
+        for _ in range(ACTIVE_CODE_DRAWS):
+            code = make_code()
+            if code not in ACTIVE_CODES:
+                break
+        ACTIVE_CODES.add(code)
+    return code
+
+
+def release_file_code(code):
+    """
+    Forget a file code once its row has been deleted.
+    """
+    with _active_codes_lock:
+        ACTIVE_CODES.discard(code)
+
+
+def load_active_codes():
+    """
+    Replace ACTIVE_CODES with the codes currently stored in the files table.
+    """
+    global _active_codes_loaded
+    with get_conn() as conn:
+        codes = {row[0] for row in conn.execute("SELECT code FROM files")}
+    with _active_codes_lock:
+        ACTIVE_CODES.clear()
+        ACTIVE_CODES.update(codes)
+        _active_codes_loaded = time.monotonic()
+
+
+def refresh_active_codes():
+    """
+    load_active_codes() if the set is older than ACTIVE_CODES_MAX_AGE_SEC,
+    picking up codes added or removed by other workers. Call it outside
+    any get_conn() block (it borrows its own connection).
+    """
+    global _active_codes_loaded
+    with _active_codes_lock:
+        if time.monotonic() - _active_codes_loaded < ACTIVE_CODES_MAX_AGE_SEC:
+            return
+        _active_codes_loaded = time.monotonic()  # only this thread reloads
+    load_active_codes()
 
 
 def six_char_code():
     """
-    Generate a unique 6-char alphanumeric code for pastes (avoiding confusing chars).
+    Generate a random 6-char alphanumeric code for pastes (avoiding confusing chars).
+    Uniqueness is enforced by insert_with_code().
     """
-    alphabet = "ABCDEFGHJKLMNPQRSTUVWXYZ23456789"
-    conn = db_conn()
-    c = conn.cursor()
-    while True:
-        code = "".join(random.choices(alphabet, k=6))
-        c.execute("SELECT 1 FROM pastes WHERE code=?", (code,))
-        if not c.fetchone():
-            conn.close()
+    return os.urandom(6).translate(_PASTE_CODE_TABLE).decode("ascii")
+
+
+def insert_with_code(conn, make_code, sql, params):
+    """
+    Run an INSERT whose first parameter is a fresh code from make_code().
+    The UNIQUE(code) constraint catches collisions, so there is no
+    separate existence SELECT; on IntegrityError a new code is tried.
+    Returns the code that was stored.
+    """
+    for _ in range(CODE_INSERT_ATTEMPTS):
+        code = make_code()
+        try:
+            conn.execute(sql, (code, *params))
             return code
+        except sqlite3.IntegrityError:
+            continue
+    raise RuntimeError("Could not allocate a unique code")
+
+load_active_codes()
+
+# Spools this old were left behind by a worker that was killed mid-upload
+_stale_spools = _sweep_stale_spools(int(time.time()) - EXPIRY_SECONDS)
+if _stale_spools:
+    logger.info(f"🧹 Deleted {_stale_spools} abandoned upload spools")
+
+
+def key_matches(supplied, expected):
+    """
+    Constant-time check of a ?key=... secret (no early exit on first mismatch).
+    """
+    return hmac.compare_digest((supplied or "").encode("utf-8"), expected.encode("utf-8"))
+
+
+@app.template_filter("utc")
+def format_utc(ts):
+    """
+    Jinja filter: render a unix timestamp column as 'YYYY-MM-DD HH:MM:SS' (UTC).
+    """
+    if ts is None:
+        return ""
+    return time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime(ts))
 
 # =============================================================================
 # Routes — Core Pages
@@ -371,11 +857,34 @@ def support():
 # Feedback (with email notification)
 # =============================================================================
 
+# Notification emails are sent by a background thread: the SMTP handshake
+# (STARTTLS to smtp.gmail.com) takes hundreds of ms and must not block requests.
+_mail_queue = queue.Queue()
+
+
+def _mail_worker():
+    """
+    Drain _mail_queue and send each message; failures are only logged.
+    """
+    while True:
+        msg = _mail_queue.get()
+        try:
+            with app.app_context():
+                mail.send(msg)
+        except Exception as e:
+            logger.warning(f"⚠️ Email sending failed: {e}")
+        finally:
+            _mail_queue.task_done()
+
+
+threading.Thread(target=_mail_worker, daemon=True).start()
+
+
 @app.route("/feedback", methods=["GET", "POST"])
 def feedback():
     """
     GET  -> Renders feedback form
-    POST -> Stores feedback and sends email notification to admin
+    POST -> Stores feedback and queues an email notification to admin
     """
     if request.method == "POST":
         name = request.form.get("name", "Anonymous").strip() or "Anonymous"
@@ -384,15 +893,13 @@ def feedback():
         if not message:
             return jsonify({"error": "Feedback message cannot be empty!"}), 400
 
-        conn = db_conn()
-        conn.execute(
-            "INSERT INTO feedback (name, message, created_at) VALUES (?, ?, ?)",
-            (name, message, datetime.utcnow().isoformat())
-        )
-        conn.commit()
-        conn.close()
+        with get_conn(immediate=True) as conn:
+            conn.execute(
+                "INSERT INTO feedback (name, message, created_at) VALUES (?, ?, ?)",
+                (name, message, int(time.time()))
+            )
 
-        # Try sending email to admin
+        # Queue email to admin (sent by _mail_worker)
         try:
             msg = Message(
                 subject=f"📬 New Feedback from {name}",
@@ -400,12 +907,12 @@ def feedback():
                 body=(
                     f"Name: {name}\n"
                     f"Message: {message}\n"
-                    f"Time (UTC): {datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S')}\n"
+                    f"Time (UTC): {time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime())}\n"
                 ),
             )
-            mail.send(msg)
+            _mail_queue.put(msg)
         except Exception as e:
-            logger.warning(f"⚠️ Email sending failed: {e}")
+            logger.warning(f"⚠️ Email queueing failed: {e}")
 
         logger.info(f"💬 Feedback from {name}: {message}")
         return jsonify({"message": "Thank you for your feedback!"})
@@ -416,6 +923,34 @@ def feedback():
 # Optional: Basic Auth Pages (kept for future admin use; not required)
 # =============================================================================
 
+# Password hashing (scrypt/pbkdf2) is slow on purpose. It runs on a
+# dedicated pool, one thread per core: hashlib releases the GIL, so the
+# threads hash in parallel, and a signup/login burst is bounded by the pool
+# size instead of tying up every request worker at once.
+PASSWORD_HASH_TIMEOUT_SEC = 10
+PASSWORD_HASH_WORKERS = os.cpu_count() or 1
+_hash_pool = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="pwhash")
+
+# Checked instead when a login email is unknown, so unknown and known
+# emails take the same time (no account-enumeration timing oracle)
+_DUMMY_PASSWORD_HASH = generate_password_hash(secrets.token_urlsafe(16))
+
+
+def hash_password(password):
+    """
+    generate_password_hash() on the hashing pool.
+    Raises concurrent.futures.TimeoutError if the pool is backed up.
+    """
+    return _hash_pool.submit(generate_password_hash, password).result(timeout=PASSWORD_HASH_TIMEOUT_SEC)
+
+
+def verify_password(pwhash, password):
+    """
+    check_password_hash() on the hashing pool.
+    Raises concurrent.futures.TimeoutError if the pool is backed up.
+    """
+    return _hash_pool.submit(check_password_hash, pwhash, password).result(timeout=PASSWORD_HASH_TIMEOUT_SEC)
+
 @app.route("/register", methods=["GET", "POST"])
 def register():
     """
@@ -430,20 +965,22 @@ def register():
             flash("Please fill in all fields!", "error")
             return redirect(url_for("register"))
 
-        hashed_password = generate_password_hash(password)
-        conn = db_conn()
         try:
-            conn.execute(
-                "INSERT INTO users (username, email, password) VALUES (?, ?, ?)",
-                (username, email, hashed_password)
-            )
-            conn.commit()
+            hashed_password = hash_password(password)
+        except FutureTimeout:
+            flash("Server is busy, please try again.", "error")
+            return redirect(url_for("register"))
+
+        try:
+            with get_conn(immediate=True) as conn:
+                conn.execute(
+                    "INSERT INTO users (username, email, password) VALUES (?, ?, ?)",
+                    (username, email, hashed_password)
+                )
             flash("Account created successfully! Please log in.", "success")
             return redirect(url_for("login"))
         except sqlite3.IntegrityError:
             flash("Username or Email already exists!", "error")
-        finally:
-            conn.close()
     return render_template("register.html")
 
 
@@ -456,13 +993,19 @@ def login():
         email = request.form.get("email", "").strip().lower()
         password = request.form.get("password", "")
 
-        conn = db_conn()
-        c = conn.cursor()
-        c.execute("SELECT id, username, email, password FROM users WHERE email=?", (email,))
-        user = c.fetchone()
-        conn.close()
+        with get_conn() as conn:
+            c = conn.cursor()
+            c.execute("SELECT id, username, email, password FROM users WHERE email=?", (email,))
+            user = c.fetchone()
 
-        if user and check_password_hash(user["password"], password):
+        try:
+            valid = verify_password(user["password"] if user else _DUMMY_PASSWORD_HASH, password)
+            valid = valid and user is not None
+        except FutureTimeout:
+            flash("Server is busy, please try again.", "error")
+            return redirect(url_for("login"))
+
+        if valid:
             session["user"] = user["username"]
             flash(f"Welcome back, {user['username']}!", "success")
             return redirect(url_for("home"))
@@ -483,18 +1026,22 @@ def reset():
             flash("Please fill in all fields!", "error")
             return redirect(url_for("reset"))
 
-        hashed = generate_password_hash(new_password)
-        conn = db_conn()
-        c = conn.cursor()
-        c.execute("SELECT 1 FROM users WHERE email=?", (email,))
-        if c.fetchone():
-            conn.execute("UPDATE users SET password=? WHERE email=?", (hashed, email))
-            conn.commit()
-            conn.close()
+        try:
+            hashed = hash_password(new_password)
+        except FutureTimeout:
+            flash("Server is busy, please try again.", "error")
+            return redirect(url_for("reset"))
+
+        with get_conn(immediate=True) as conn:
+            c = conn.cursor()
+            c.execute("SELECT 1 FROM users WHERE email=?", (email,))
+            found = c.fetchone() is not None
+            if found:
+                conn.execute("UPDATE users SET password=? WHERE email=?", (hashed, email))
+        if found:
             flash("Password reset successful! Please log in.", "success")
             return redirect(url_for("login"))
         else:
-            conn.close()
             flash("No account found with that email.", "error")
     return render_template("reset.html")
 
@@ -513,15 +1060,17 @@ def logout():
 @app.route("/admin/feedbacks")
 def admin_feedbacks():
     secret = request.args.get("key", "")
-    if secret != "NathaniyeluSuperSecret":
+    if not key_matches(secret, ADMIN_FEEDBACK_KEY):
         return "Access Denied 🚫", 403
 
-    conn = db_conn()
-    c = conn.cursor()
-    c.execute("SELECT name, message, created_at FROM feedback ORDER BY created_at DESC")
-    feedbacks = c.fetchall()
-    conn.close()
-    return render_template("admin_feedbacks.html", feedbacks=feedbacks)
+    with get_conn() as conn:
+        c = conn.cursor()
+        c.execute("SELECT name, message, created_at FROM feedback ORDER BY created_at DESC")
+        # Render straight from the cursor (no list of every row); the
+        # template only needs to know whether there is a first row
+        first = c.fetchone()
+        feedbacks = itertools.chain((first,), c) if first else None
+        return render_template("admin_feedbacks.html", feedbacks=feedbacks)
 
 
 
@@ -529,6 +1078,189 @@ def admin_feedbacks():
 # File Sharing (Upload / Download)
 # =============================================================================
 
+# Disk writes for streamed uploads run here, so the request thread can read
+# the next chunk off the socket while the previous one is being written
+_upload_write_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="upload-write")
+
+
+def _spool_stream(stream, f, expected=None):
+    """
+    Copy `stream` into the open file `f` in UPLOAD_CHUNK_SIZE chunks, with
+    one write in flight at a time (double buffering: writes stay in order).
+    Disk is reserved just ahead of the data, up to `expected` bytes (see
+    _reserve_ahead).
+    Returns the number of bytes copied.
+    """
+    received = 0
+    reserved = 0
+    pending = None
+    while chunk := stream.read(UPLOAD_CHUNK_SIZE):
+        reserved = _reserve_ahead(f.fileno(), reserved, received + len(chunk), expected)
+        if pending is not None:
+            pending.result()
+        pending = _upload_write_pool.submit(f.write, chunk)
+        received += len(chunk)
+    if pending is not None:
+        pending.result()
+    return received
+
+
+# O_DIRECT transfers must be aligned (buffer address, offset and length) to
+# the device's logical block size; 4096 covers common disks
+DIRECT_IO_ALIGN = 4096
+
+
+def _open_direct(path):
+    """
+    Open `path` for O_DIRECT writes (bypassing the page cache).
+    Returns None where unsupported (non-Linux, tmpfs, ...).
+    """
+    if not hasattr(os, "O_DIRECT"):
+        return None
+    try:
+        return os.open(path, os.O_WRONLY | os.O_DIRECT)
+    except OSError:
+        return None
+
+
+# Spools reserve disk at most this far ahead of the bytes actually received,
+# so a client that announces 2GB and then stalls pins only this much
+UPLOAD_PREALLOC_STEP = 8 * UPLOAD_CHUNK_SIZE  # 32MB
+
+
+def _preallocate(fd, offset, length):
+    """
+    Reserve `length` bytes of a spool from `offset` (a few large extent
+    reservations instead of growing the file chunk by chunk). Best effort:
+    skipped where posix_fallocate is missing or the filesystem refuses it.
+    """
+    if length <= 0 or not hasattr(os, "posix_fallocate"):
+        return
+    try:
+        os.posix_fallocate(fd, offset, length)
+    except OSError:
+        pass
+
+
+def _reserve_ahead(fd, reserved, needed, expected):
+    """
+    Grow a spool's reservation so it covers `needed` bytes plus up to one
+    UPLOAD_PREALLOC_STEP more, never past the `expected` (announced) size.
+    Nothing is reserved when the size is unknown.
+    Returns the new reserved size.
+    """
+    if not expected or needed <= reserved:
+        return reserved
+    end = min(expected, max(needed, reserved + UPLOAD_PREALLOC_STEP))
+    if end > reserved:
+        _preallocate(fd, reserved, end - reserved)
+        reserved = end
+    return reserved
+
+
+def _fill_buffer(stream, buf):
+    """
+    Read from `stream` into `buf` until it is full or the stream ends.
+    Returns the number of bytes read.
+    """
+    view = memoryview(buf)
+    filled = 0
+    while filled < len(view):
+        got = stream.readinto(view[filled:])
+        if not got:
+            break
+        filled += got
+    return filled
+
+
+def _spool_stream_direct(stream, fd, expected=None):
+    """
+    O_DIRECT variant of _spool_stream(): uploads are written once and read
+    once, so caching them only evicts hot pages (users.db, templates).
+    Two page-aligned mmap buffers alternate between the socket read and the
+    in-flight write; the last block is padded to DIRECT_IO_ALIGN and the
+    file is truncated back to the real size. Disk is reserved as in
+    _spool_stream().
+    Returns the number of bytes copied.
+    """
+    buffers = (mmap.mmap(-1, UPLOAD_CHUNK_SIZE), mmap.mmap(-1, UPLOAD_CHUNK_SIZE))
+    received = 0
+    reserved = 0
+    pending = None
+    turn = 0
+    # A buffer is only refilled after the write that used it has finished
+    while filled := _fill_buffer(stream, buffers[turn]):
+        reserved = _reserve_ahead(fd, reserved, received + filled, expected)
+        if pending is not None:
+            pending.result()
+        size = -(-filled // DIRECT_IO_ALIGN) * DIRECT_IO_ALIGN
+        pending = _upload_write_pool.submit(os.pwrite, fd, memoryview(buffers[turn])[:size], received)
+        received += filled
+        turn ^= 1
+        if filled < UPLOAD_CHUNK_SIZE:
+            break
+    if pending is not None:
+        pending.result()
+    os.ftruncate(fd, received)
+    return received
+
+
+def _parse_max_downloads(value):
+    """
+    max_downloads from a form/query value: default 1, capped at 100.
+    """
+    try:
+        max_downloads = int(value)
+    except (TypeError, ValueError):
+        max_downloads = 1
+    return max(1, min(max_downloads, 100))
+
+
+def _register_upload(spool_path, safe_name, max_downloads):
+    """
+    Insert the files row for a finished spool in UPLOAD_FOLDER and rename the
+    spool to stored_file_path(code). Returns the new code.
+    If the transaction fails after the rename, the file is moved back to
+    `spool_path` (where the caller's cleanup expects it) and the code is
+    released.
+    """
+    refresh_active_codes()
+    code = None
+    moved = False
+    try:
+        with get_conn(immediate=True) as conn:
+            expired = expire_batch(conn)
+            code = insert_with_code(
+                conn, new_file_code,
+                SQL_FILE_INSERT,
+                (safe_name, int(time.time()), max_downloads, 0)
+            )
+            # Move into place before the row commits, so it is never visible without its file
+            # A single rename: the fan-out directories already exist
+            os.replace(spool_path, stored_file_path(code))
+            moved = True
+    except Exception:
+        if moved:
+            os.replace(stored_file_path(code), spool_path)
+        if code is not None:
+            release_file_code(code)
+        raise
+    remove_expired_files(expired)
+    return code
+
+
+def _upload_result(code, max_downloads):
+    """
+    JSON body returned by both upload endpoints.
+    """
+    return jsonify({
+        "message": "File uploaded successfully!",
+        "code": code,
+        "max_downloads": max_downloads,
+        "expires_in_hours": 24
+    })
+
+
 @app.route("/upload", methods=["POST"])
 def upload_file():
     """
@@ -547,33 +1279,336 @@ def upload_file():
     if not agreed:
         return jsonify({"error": "Please accept the Terms first!"}), 400
 
+    max_downloads = _parse_max_downloads(request.form.get("max_downloads", "1"))
+
+    safe_name = secure_filename(file.filename or "file") or "file"
+    # The body already sits in a spool file in UPLOAD_FOLDER (see UploadRequest);
+    # the code is only known once the INSERT succeeds, so rename it afterwards.
+    file.stream.flush()
+    code = _register_upload(file.stream.name, safe_name, max_downloads)
+
+    return _upload_result(code, max_downloads)
+
+
+@app.route("/upload_raw", methods=["POST", "PUT"])
+def upload_raw():
+    """
+    Streaming upload: the request body *is* the file (no multipart parsing).
+    Query string:
+      - filename (optional, default 'file')
+      - max_downloads (optional, default 1, capped 100)
+      - agreed_terms=true (required)
+    The body is copied from request.stream in 4MB chunks straight into a
+    spool in UPLOAD_FOLDER (see _spool_stream), then registered exactly
+    like /upload.
+    """
+    agreed = request.args.get("agreed_terms", "false").lower() == "true"
+    if not agreed:
+        return jsonify({"error": "Please accept the Terms first!"}), 400
+
+    max_downloads = _parse_max_downloads(request.args.get("max_downloads", "1"))
+    safe_name = secure_filename(request.args.get("filename") or "file") or "file"
+
+    fd, spool_path = tempfile.mkstemp(dir=UPLOAD_FOLDER, prefix=UPLOAD_SPOOL_PREFIX)
     try:
-        max_downloads = int(request.form.get("max_downloads", "1"))
-    except ValueError:
-        max_downloads = 1
-    max_downloads = max(1, min(max_downloads, 100))
+        os.fchmod(fd, UPLOAD_FILE_MODE)
 
-    code = six_digit_code()
-    safe_name = secure_filename(file.filename or "file")
-    filepath = os.path.join(UPLOAD_FOLDER, f"{code}_{safe_name}")
-    file.save(filepath)
+        direct_fd = _open_direct(spool_path)
+        if direct_fd is not None:
+            os.close(fd)
+            try:
+                received = _spool_stream_direct(request.stream, direct_fd, request.content_length)
+            finally:
+                os.close(direct_fd)
+        else:
+            # Large writes bypass the buffer, so this is one copy: socket -> file
+            with os.fdopen(fd, "wb") as f:
+                received = _spool_stream(request.stream, f, request.content_length)
+
+        if not received:
+            unlink_quietly(spool_path)
+            return jsonify({"error": "No file selected!"}), 400
+
+        # A client that disconnects mid-body can look like a normal EOF
+        # (gunicorn), so never store a file shorter than it was announced
+        if request.content_length is not None and received != request.content_length:
+            unlink_quietly(spool_path)
+            logger.warning(f"⚠️ Raw upload cut short: {received} of {request.content_length} bytes")
+            return jsonify({"error": "Upload incomplete, please try again."}), 400
+
+        code = _register_upload(spool_path, safe_name, max_downloads)
+    except Exception:
+        unlink_quietly(spool_path)
+        raise
 
-    conn = db_conn()
-    conn.execute(
-        "INSERT INTO files (code, filename, created_at, max_downloads, current_downloads) VALUES (?, ?, ?, ?, ?)",
-        (code, safe_name, datetime.utcnow().isoformat(), max_downloads, 0)
-    )
-    conn.commit()
-    conn.close()
+    return _upload_result(code, max_downloads)
+
+
+# -----------------------------------------------------------------------------
+# Resumable uploads: the client declares the size, PUTs chunks at any offset
+# (out of order, retried, or in parallel), then finalizes. A failed chunk
+# only costs that chunk, not the whole transfer.
+#   POST /upload/chunked                  JSON {filename, size, max_downloads, agreed_terms}
+#   PUT  /upload/<upload_id>/<offset>     body = bytes at that offset
+#   GET  /upload/<upload_id>              where to resume
+#   POST /upload/<upload_id>/finalize     -> same JSON as /upload
+# -----------------------------------------------------------------------------
+
+# Suggested chunk size: large enough that a 2GB upload stays well inside the
+# per-IP rate limit
+CHUNKED_UPLOAD_PART_SIZE = 32 * 1024 * 1024  # 32MB
+
+# Unfinished uploads one client may hold open (sessions live up to 24h)
+CHUNKED_UPLOAD_MAX_SESSIONS_PER_IP = 8
+CHUNKED_UPLOAD_MAX_BYTES_PER_IP = 4 * 1024 * 1024 * 1024  # 4GB declared in total
+
+
+def _chunked_spool_path(upload_id):
+    """
+    Spool file of a chunked upload. It carries UPLOAD_SPOOL_PREFIX, so the
+    start-up spool sweep also covers uploads that were never finished.
+    """
+    return os.path.join(UPLOAD_FOLDER, UPLOAD_SPOOL_PREFIX + upload_id)
+
+
+def _chunked_session(conn, upload_id):
+    """
+    The live (unexpired) upload_sessions row for `upload_id`, or None.
+    """
+    return conn.execute(
+        "SELECT id, filename, max_downloads, total_size FROM upload_sessions WHERE upload_id=? AND created_at > ?",
+        (upload_id, int(time.time()) - EXPIRY_SECONDS)
+    ).fetchone()
+
+
+def _chunked_next_offset(conn, session_id):
+    """
+    End of the contiguous run of received bytes starting at 0: where the
+    client should resume. Overlapping chunks are fine.
+    """
+    end = 0
+    for start, length in conn.execute(
+        "SELECT start, length FROM upload_chunks WHERE session_id=? ORDER BY start", (session_id,)
+    ):
+        if start > end:
+            break
+        end = max(end, start + length)
+    return end
+
+
+@app.route("/upload/chunked", methods=["POST"])
+def upload_chunked_start():
+    """
+    Start a resumable upload. Returns the upload_id to PUT chunks to and
+    a suggested chunk size. The spool is a sparse file of the full size:
+    disk is only used as chunks are written. Each client may hold at most
+    CHUNKED_UPLOAD_MAX_SESSIONS_PER_IP unfinished uploads, declaring
+    CHUNKED_UPLOAD_MAX_BYTES_PER_IP in total.
+    """
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({"error": "Expected a JSON object."}), 400
+    if str(data.get("agreed_terms", "false")).lower() != "true":
+        return jsonify({"error": "Please accept the Terms first!"}), 400
+
+    try:
+        total_size = int(data.get("size", 0))
+    except (TypeError, ValueError):
+        total_size = 0
+    if total_size <= 0:
+        return jsonify({"error": "No file selected!"}), 400
+    if total_size > app.config["MAX_CONTENT_LENGTH"]:
+        raise RequestEntityTooLarge()
+
+    max_downloads = _parse_max_downloads(data.get("max_downloads", "1"))
+    safe_name = secure_filename(data.get("filename") or "file") or "file"
+    upload_id = secrets.token_urlsafe(16)
+    client_ip = _client_ip()
+    now = int(time.time())
+
+    spool_path = _chunked_spool_path(upload_id)
+    fd = os.open(spool_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, UPLOAD_FILE_MODE)
+    try:
+        os.ftruncate(fd, total_size)
+    finally:
+        os.close(fd)
+
+    try:
+        with get_conn(immediate=True) as conn:
+            open_sessions, open_bytes = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(total_size), 0) FROM upload_sessions "
+                "WHERE client_ip=? AND created_at > ?",
+                (client_ip, now - EXPIRY_SECONDS)
+            ).fetchone()
+            if (open_sessions >= CHUNKED_UPLOAD_MAX_SESSIONS_PER_IP
+                    or open_bytes + total_size > CHUNKED_UPLOAD_MAX_BYTES_PER_IP):
+                unlink_quietly(spool_path)
+                logger.warning(f"⚠️ Chunked upload refused for {client_ip}: {open_sessions} open, {open_bytes} bytes")
+                return jsonify({"error": "Too many unfinished uploads. Finish or wait for them to expire."}), 429
+            conn.execute(
+                "INSERT INTO upload_sessions (upload_id, filename, max_downloads, total_size, created_at, client_ip) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (upload_id, safe_name, max_downloads, total_size, now, client_ip)
+            )
+    except Exception:
+        unlink_quietly(spool_path)
+        raise
 
     return jsonify({
-        "message": "File uploaded successfully!",
-        "code": code,
-        "max_downloads": max_downloads,
+        "upload_id": upload_id,
+        "size": total_size,
+        "chunk_size": CHUNKED_UPLOAD_PART_SIZE,
         "expires_in_hours": 24
     })
 
 
+@app.route("/upload/<upload_id>", methods=["GET"])
+def upload_chunked_status(upload_id):
+    """
+    Where a resumable upload stands: the offset to resume from.
+    """
+    with get_conn() as conn:
+        session_row = _chunked_session(conn, upload_id)
+        if not session_row:
+            return jsonify({"error": "Invalid or expired upload!"}), 404
+        next_offset = _chunked_next_offset(conn, session_row["id"])
+    return jsonify({"next_offset": next_offset, "size": session_row["total_size"]})
+
+
+@app.route("/upload/<upload_id>/<int:offset>", methods=["PUT"])
+def upload_chunked_part(upload_id, offset):
+    """
+    Write one chunk (the request body) at `offset` with pwrite, so chunks
+    may arrive in any order. Re-sending a chunk is harmless.
+    The spool is held under a shared flock() from before the session check
+    until the chunk is recorded; finalize takes it exclusively, so it never
+    publishes a file that is still being written to.
+    """
+    try:
+        fd = os.open(_chunked_spool_path(upload_id), os.O_WRONLY)
+    except FileNotFoundError:
+        return jsonify({"error": "Invalid or expired upload!"}), 404
+    try:
+        fcntl.flock(fd, fcntl.LOCK_SH)
+        # Checked under the lock: a finalize that got in first has already
+        # claimed the session, and this fd may now point at a published file
+        with get_conn() as conn:
+            session_row = _chunked_session(conn, upload_id)
+        if not session_row:
+            return jsonify({"error": "Invalid or expired upload!"}), 404
+        total_size = session_row["total_size"]
+
+        length = 0
+        while piece := request.stream.read(UPLOAD_CHUNK_SIZE):
+            if offset + length + len(piece) > total_size:
+                return jsonify({"error": "Chunk runs past the declared size."}), 400
+            os.pwrite(fd, piece, offset + length)
+            length += len(piece)
+
+        if not length:
+            return jsonify({"error": "Empty chunk!"}), 400
+
+        with get_conn(immediate=True) as conn:
+            # The session may have expired while the body was streaming
+            if not _chunked_session(conn, upload_id):
+                return jsonify({"error": "Invalid or expired upload!"}), 404
+            conn.execute(
+                "INSERT INTO upload_chunks (session_id, start, length) VALUES (?, ?, ?) "
+                "ON CONFLICT(session_id, start) DO UPDATE SET length = MAX(length, excluded.length)",
+                (session_row["id"], offset, length)
+            )
+            next_offset = _chunked_next_offset(conn, session_row["id"])
+    finally:
+        os.close(fd)  # also drops the lock
+
+    return jsonify({"next_offset": next_offset, "size": total_size})
+
+
+@app.route("/upload/<upload_id>/finalize", methods=["POST"])
+def upload_chunked_finish(upload_id):
+    """
+    Turn a complete resumable upload into a normal file with a download
+    code. The session row is claimed (deleted) first, so a repeated
+    finalize cannot register the same spool twice. Answers 409 while a
+    chunk PUT still holds the spool (see upload_chunked_part).
+    """
+    spool_path = _chunked_spool_path(upload_id)
+    try:
+        lock_fd = os.open(spool_path, os.O_RDONLY)
+    except FileNotFoundError:
+        return jsonify({"error": "Invalid or expired upload!"}), 404
+    try:
+        try:
+            fcntl.flock(lock_fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return jsonify({"error": "A chunk is still being written. Try again once it completes."}), 409
+
+        with get_conn(immediate=True) as conn:
+            session_row = _chunked_session(conn, upload_id)
+            if not session_row:
+                return jsonify({"error": "Invalid or expired upload!"}), 404
+            received = _chunked_next_offset(conn, session_row["id"])
+            if received < session_row["total_size"]:
+                return jsonify({
+                    "error": "Upload is incomplete.",
+                    "next_offset": received,
+                    "size": session_row["total_size"]
+                }), 409
+            conn.execute("DELETE FROM upload_sessions WHERE id=?", (session_row["id"],))
+
+        try:
+            code = _register_upload(spool_path, session_row["filename"], session_row["max_downloads"])
+        except Exception:
+            unlink_quietly(spool_path)
+            raise
+    finally:
+        os.close(lock_fd)
+
+    return _upload_result(code, session_row["max_downloads"])
+
+
+def _delete_file_record(fid, code, file_path):
+    """
+    Remove a file's row and its data after the last allowed download.
+    Runs in the request's own worker, or from a timer in X-Accel mode, with
+    a pooled connection for the DELETE. The DELETE only matches a used-up
+    row, so exactly one caller wins and unlinks the file. If the timer never
+    fires (worker restart), the row stays used up and the 24h expiry
+    removes it.
+    """
+    try:
+        with get_conn(immediate=True) as conn:
+            won = conn.execute(
+                "DELETE FROM files WHERE id=? AND current_downloads >= max_downloads RETURNING 1", (fid,)
+            ).fetchone()
+    except Exception as e:
+        logger.error(f"Post-download cleanup failed for file {fid}: {e}")
+        return
+    if not won:
+        return
+    release_file_code(code)
+    unlink_quietly(file_path)
+
+
+def _send_open_file(f, filename):
+    """
+    send_file() for an upload that is already open. send_file() only works
+    out the size, ETag and Range support for paths, so they are set here
+    from fstat (Range / If-None-Match still work).
+    """
+    st = os.fstat(f.fileno())
+    response = send_file(
+        f, as_attachment=True, download_name=filename, conditional=False,
+        last_modified=st.st_mtime, etag=f"{st.st_mtime}-{st.st_size}-{st.st_ino}"
+    )
+    response.content_length = st.st_size
+    try:
+        return response.make_conditional(request, accept_ranges=True, complete_length=st.st_size)
+    except RequestedRangeNotSatisfiable:
+        f.close()
+        raise
+
+
 @app.route("/download/<code>")
 def download_file(code):
     """
@@ -582,55 +1617,72 @@ def download_file(code):
     - Deletes file+record if limit reached (after sending)
     - Expires after 24 hours
     """
-    conn = db_conn()
-    c = conn.cursor()
-    c.execute("SELECT id, filename, created_at, max_downloads, current_downloads FROM files WHERE code=?", (code,))
-    row = c.fetchone()
-    if not row:
-        conn.close()
-        return jsonify({"error": "Invalid or expired code!"}), 404
-
-    fid = row["id"]
-    filename = row["filename"]
-    created_at = datetime.fromisoformat(row["created_at"])
-    max_downloads = row["max_downloads"]
-    current_downloads = row["current_downloads"]
-
-    file_path = os.path.join(UPLOAD_FOLDER, f"{code}_{filename}")
-
-    if datetime.utcnow() >= created_at + timedelta(hours=24) or not os.path.exists(file_path):
-        if os.path.exists(file_path):
-            try:
-                os.remove(file_path)
-            except Exception:
-                pass
-        conn.execute("DELETE FROM files WHERE id=?", (fid,))
-        conn.commit()
-        conn.close()
-        return jsonify({"error": "This file has expired."}), 410
-
-    new_count = current_downloads + 1
-    conn.execute("UPDATE files SET current_downloads=? WHERE id=?", (new_count, fid))
-    conn.commit()
-    conn.close()
-
-    response = send_from_directory(UPLOAD_FOLDER, f"{code}_{filename}", as_attachment=True)
+    now = int(time.time())
+    with get_conn(immediate=True) as conn:
+        row = conn.execute(SQL_FILE_CONSUME, (code, now - EXPIRY_SECONDS)).fetchone()
+
+        if not row:
+            # Past 24h: drop the leftover row + file
+            gone = conn.execute(
+                "DELETE FROM files WHERE code=? AND created_at <= ? RETURNING 1",
+                (code, now - EXPIRY_SECONDS)
+            ).fetchone()
+            if gone:
+                release_file_code(code)
+                unlink_quietly(stored_file_path(code))
+                return jsonify({"error": "This file has expired."}), 410
+            # Used up: the last download may still be in flight (nginx has
+            # yet to open the file), so leave the row and file to
+            # _delete_file_record
+            if conn.execute("SELECT 1 FROM files WHERE code=?", (code,)).fetchone():
+                return jsonify({"error": "This file has expired."}), 410
+            return jsonify({"error": "Invalid or expired code!"}), 404
+
+        fid = row["id"]
+        filename = row["filename"]
+        file_path = stored_file_path(code)
+
+        # Open before this transaction commits: a concurrent last download
+        # can only unlink the file after that, and the open handle keeps
+        # the data readable until it has been sent
+        data = None
+        try:
+            if X_ACCEL_REDIRECT_PREFIX:
+                os.stat(file_path)
+            else:
+                data = open(file_path, "rb")
+        except FileNotFoundError:
+            conn.execute("DELETE FROM files WHERE id=?", (fid,))
+            release_file_code(code)
+            return jsonify({"error": "This file has expired."}), 410
+
+        new_count = row["current_downloads"]
+        max_downloads = row["max_downloads"]
+        expired = expire_batch(conn)
+    remove_expired_files(expired)
+
+    if X_ACCEL_REDIRECT_PREFIX:
+        # nginx streams the file itself; Python never touches the bytes
+        response = Response(mimetype="application/octet-stream")
+        response.headers["X-Accel-Redirect"] = X_ACCEL_REDIRECT_PREFIX + quote(f"{code[:2]}/{code}")
+        # filename comes from secure_filename(): plain ASCII, no quotes
+        response.headers["Content-Disposition"] = f'attachment; filename="{filename}"'
+    else:
+        response = _send_open_file(data, filename)
 
     # Delete if limit reached
     if new_count >= max_downloads:
-        def _delete_after_send():
-            time.sleep(1)
-            try:
-                if os.path.exists(file_path):
-                    os.remove(file_path)
-            except Exception:
-                pass
-            conn2 = db_conn()
-            conn2.execute("DELETE FROM files WHERE id=?", (fid,))
-            conn2.commit()
-            conn2.close()
-
-        threading.Thread(target=_delete_after_send, daemon=True).start()
+        if X_ACCEL_REDIRECT_PREFIX:
+            # nginx opens the file only after reading these headers, which can
+            # be after this worker has closed the response: give it a grace period
+            timer = threading.Timer(X_ACCEL_DELETE_DELAY_SEC, _delete_file_record, (fid, code, file_path))
+            timer.daemon = True
+            timer.start()
+        else:
+            # The file is already open (and the passthrough response skips
+            # call_on_close), so unlink now: on POSIX the transfer carries
+            # on from the open descriptor
+            _delete_file_record(fid, code, file_path)
 
     return response
 
@@ -668,14 +1720,14 @@ def create_paste():
     if not content:
         return jsonify({"error": "Content cannot be empty!"}), 400
 
-    code = six_char_code()
-    conn = db_conn()
-    conn.execute(
-        "INSERT INTO pastes (code, content, lang, created_at, max_views, current_views) VALUES (?, ?, ?, ?, ?, ?)",
-        (code, content, lang, datetime.utcnow().isoformat(), max_views, 0)
-    )
-    conn.commit()
-    conn.close()
+    with get_conn(immediate=True) as conn:
+        code = insert_with_code(
+            conn, six_char_code,
+            SQL_PASTE_INSERT,
+            (content, lang, int(time.time()), max_views, 0)
+        )
+        expired = expire_batch(conn)
+    remove_expired_files(expired)
 
     return jsonify({
         "message": "Paste created successfully!",
@@ -684,38 +1736,46 @@ def create_paste():
     })
 
 
+def _consume_paste_view(code):
+    """
+    Count one view of a paste with a single atomic UPDATE ... RETURNING
+    (expiry check + increment + fetch in one statement, no race between
+    concurrent viewers).
+    Returns (row, expired):
+      - (row, False)  -> view allowed; row has content and lang
+      - (None, True)  -> paste existed but is expired/used up
+      - (None, False) -> no such paste
+    The last allowed view keeps the row as an empty tombstone so the next
+    request still gets 410 rather than 404; that request (or the 24h
+    expiry) deletes it.
+    """
+    now = int(time.time())
+    with get_conn(immediate=True) as conn:
+        row = conn.execute(SQL_PASTE_CONSUME, (code, now - EXPIRY_SECONDS)).fetchone()
+
+        if not row:
+            # Either unknown, or expired/out of views: drop any leftover row
+            c = conn.execute("DELETE FROM pastes WHERE code=?", (code,))
+            return None, c.rowcount > 0
+
+        # That was the last allowed view: drop the content, keep the row
+        if row["current_views"] >= row["max_views"]:
+            conn.execute("UPDATE pastes SET content='' WHERE id=?", (row["id"],))
+
+    return row, False
+
+
 @app.route("/view/<code>")
 def view_paste(code):
     """
     Render a paste in pretty page; increments view count and deletes
     the row when limits reached or expired.
     """
-    conn = db_conn()
-    c = conn.cursor()
-    c.execute("SELECT id, content, lang, created_at, max_views, current_views FROM pastes WHERE code=?", (code,))
-    row = c.fetchone()
+    row, _expired = _consume_paste_view(code)
     if not row:
-        conn.close()
-        return render_template("paste_not_found.html"), 404
-
-    pid = row["id"]
-    content = row["content"]
-    lang = row["lang"]
-    created_at = datetime.fromisoformat(row["created_at"])
-    max_views = row["max_views"]
-    current_views = row["current_views"]
-
-    if datetime.utcnow() >= created_at + timedelta(hours=24) or current_views >= max_views:
-        conn.execute("DELETE FROM pastes WHERE id=?", (pid,))
-        conn.commit()
-        conn.close()
         return render_template("paste_not_found.html"), 404
 
-    conn.execute("UPDATE pastes SET current_views=? WHERE id=?", (current_views + 1, pid))
-    conn.commit()
-    conn.close()
-
-    return render_template("paste_view.html", code=code, content=content, lang=lang)
+    return render_template("paste_view.html", code=code, content=row["content"], lang=row["lang"])
 
 
 @app.route("/raw/<code>")
@@ -723,31 +1783,13 @@ def raw_paste(code):
     """
     Return paste as plain text; increments view count and deletes if exceeded or expired.
     """
-    conn = db_conn()
-    c = conn.cursor()
-    c.execute("SELECT id, content, created_at, max_views, current_views FROM pastes WHERE code=?", (code,))
-    row = c.fetchone()
+    row, expired = _consume_paste_view(code)
     if not row:
-        conn.close()
+        if expired:
+            return "Paste expired", 410
         return "Paste not found", 404
 
-    pid = row["id"]
-    content = row["content"]
-    created_at = datetime.fromisoformat(row["created_at"])
-    max_views = row["max_views"]
-    current_views = row["current_views"]
-
-    if datetime.utcnow() >= created_at + timedelta(hours=24) or current_views >= max_views:
-        c.execute("DELETE FROM pastes WHERE id=?", (pid,))
-        conn.commit()
-        conn.close()
-        return "Paste expired", 410
-
-    c.execute("UPDATE pastes SET current_views=? WHERE id=?", (current_views + 1, pid))
-    conn.commit()
-    conn.close()
-
-    return content, 200, {"Content-Type": "text/plain; charset=utf-8"}
+    return row["content"], 200, {"Content-Type": "text/plain; charset=utf-8"}
 
 # =============================================================================
 # Admin/Utility Endpoints (Optional)
@@ -760,27 +1802,26 @@ def admin_stats():
     Example: /admin-stats?key=nathanieyulu_secret
     """
     token = request.args.get("key")
-    if token != ADMIN_STATS_KEY:
+    if not key_matches(token, ADMIN_STATS_KEY):
         return "Access denied", 403
 
-    conn = db_conn()
-    c = conn.cursor()
+    with get_conn() as conn:
+        c = conn.cursor()
 
-    c.execute("SELECT COUNT(*) FROM files")
-    total_files = c.fetchone()[0]
+        c.execute("SELECT COUNT(*) FROM files")
+        total_files = c.fetchone()[0]
 
-    c.execute("SELECT COUNT(*) FROM pastes")
-    total_texts = c.fetchone()[0]
+        c.execute("SELECT COUNT(*) FROM pastes")
+        total_texts = c.fetchone()[0]
 
-    c.execute("SELECT COUNT(*) FROM feedback")
-    total_feedbacks = c.fetchone()[0]
+        c.execute("SELECT COUNT(*) FROM feedback")
+        total_feedbacks = c.fetchone()[0]
 
-    c.execute("SELECT SUM(current_downloads) FROM files")
-    total_downloads = c.fetchone()[0] or 0
+        c.execute("SELECT SUM(current_downloads) FROM files")
+        total_downloads = c.fetchone()[0] or 0
 
-    c.execute("SELECT name, message, created_at FROM feedback ORDER BY id DESC LIMIT 10")
-    recent_feedbacks = c.fetchall()
-    conn.close()
+        c.execute("SELECT name, message, created_at FROM feedback ORDER BY id DESC LIMIT 10")
+        recent_feedbacks = c.fetchall()
 
     return render_template(
         "admin_stats.html",
@@ -792,12 +1833,34 @@ def admin_stats():
     )
 
 
+# Probe/crawler bodies never change, so build them once at import time
+_HEALTHZ_BODY = app.json.dumps({"status": "ok"}).encode("utf-8")
+
+_ROBOTS_BODY = (
+    "User-agent: *\n"
+    "Disallow: /download/\n"
+    "Disallow: /view/\n"
+    "Disallow: /raw/\n"
+    "Allow: /\n"
+).encode("utf-8")
+
+_SITEMAP_PATHS = ("/", "/text", "/support", "/privacy", "/terms", "/disclaimer", "/about")
+
+
+@functools.lru_cache(maxsize=16)
+def _sitemap_body(base):
+    """
+    Sitemap text for one url_root (small LRU: the Host header is client-controlled).
+    """
+    return "".join(f"{base}{path}\n" for path in _SITEMAP_PATHS).encode("utf-8")
+
+
 @app.route("/healthz")
 def healthz():
     """
-    Liveness probe.
+    Liveness probe. Static body: probes only need a 200.
     """
-    return jsonify({"status": "ok", "time_utc": datetime.utcnow().isoformat()})
+    return Response(_HEALTHZ_BODY, mimetype="application/json")
 
 
 @app.route("/robots.txt")
@@ -805,14 +1868,7 @@ def robots():
     """
     Simple robots to allow indexing of main pages but avoid dynamic codes.
     """
-    content = (
-        "User-agent: *\n"
-        "Disallow: /download/\n"
-        "Disallow: /view/\n"
-        "Disallow: /raw/\n"
-        "Allow: /\n"
-    )
-    return Response(content, mimetype="text/plain")
+    return Response(_ROBOTS_BODY, mimetype="text/plain")
 
 
 @app.route("/sitemap.txt")
@@ -820,17 +1876,7 @@ def sitemap():
     """
     Basic text sitemap for SEO.
     """
-    base = request.url_root.rstrip("/")
-    lines = [
-        f"{base}/",
-        f"{base}/text",
-        f"{base}/support",
-        f"{base}/privacy",
-        f"{base}/terms",
-        f"{base}/disclaimer",
-        f"{base}/about",
-    ]
-    return Response("\n".join(lines) + "\n", mimetype="text/plain")
+    return Response(_sitemap_body(request.url_root.rstrip("/")), mimetype="text/plain")
 
 
 # =============================================================================
@@ -865,5 +1911,9 @@ def ratelimited(e):
 # =============================================================================
 
 if __name__ == "__main__":
-    # Set debug=False in production
-    app.run(debug=True)
+    # Production: gunicorn -c gunicorn.conf.py app:app (threaded workers, sendfile).
+    # The Werkzeug dev server is only for local development.
+    if os.environ.get("FLASK_DEV"):
+        app.run(debug=True)
+    else:
+        logger.info("ℹ️ Run with: gunicorn -c gunicorn.conf.py app:app (set FLASK_DEV=1 for the dev server)")
@@ -0,0 +1,28 @@
+# gunicorn.conf.py
+"""
+Production server settings for SendingInfo.in.
+Run with:
+    gunicorn -c gunicorn.conf.py app:app
+(bind defaults to 0.0.0.0:$PORT when the host sets PORT)
+"""
+
+import os
+
+# One process per core, each with a pool of threads: a multi-GB upload or
+# download occupies one thread, not a whole worker, so others keep flowing.
+workers = os.cpu_count() or 1
+worker_class = "gthread"
+threads = 16
+
+# gthread workers heartbeat from their main loop, so a long transfer on a
+# thread never looks like a hung worker; don't kill workers on a timer.
+timeout = 0
+
+# File responses (send_file -> wsgi.file_wrapper) go out with sendfile(2)
+sendfile = True
+
+# Upload/download URLs carry query strings (/upload_raw?filename=...)
+limit_request_line = 8190
+
+# Heartbeat files on tmpfs, not disk
+worker_tmp_dir = "/dev/shm"
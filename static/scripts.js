@@ -82,15 +82,17 @@ document.addEventListener("DOMContentLoaded", () => {
       if (!isNaN(val) && val >= 1) maxDownloads = Math.min(val, 100);
     }
 
-    const formData = new FormData();
-    formData.append("file", selectedFile);
-    formData.append("max_downloads", String(maxDownloads));
-    formData.append("agreed_terms", "true");
+    // Send the file itself as the request body: the server streams it to disk
+    const params = new URLSearchParams({
+      filename: selectedFile.name,
+      max_downloads: String(maxDownloads),
+      agreed_terms: "true",
+    });
 
     uploadResult.textContent = "Uploading...";
 
     try {
-      const response = await fetch("/upload", { method: "POST", body: formData });
+      const response = await fetch(`/upload_raw?${params}`, { method: "POST", body: selectedFile });
       const data = await response.json();
 
       if (data.error) {